@@ -1,8 +1,12 @@
 # image_converter_flask.py
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from io import BytesIO
 from PIL import Image, ImageFile
-import requests, base64, os, math, sys, traceback, time
+import requests, base64, os, math, sys, traceback, time, hashlib, tempfile, threading, contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
 from urllib3.util import Retry
 from requests.adapters import HTTPAdapter
 
@@ -16,21 +20,86 @@ USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 " \
 REQUEST_CONNECT_TIMEOUT = 4.0   # seconds to connect
 REQUEST_READ_TIMEOUT = 10.0     # seconds to read
 REQUEST_TIMEOUT = (REQUEST_CONNECT_TIMEOUT, REQUEST_READ_TIMEOUT)
-MAX_DOWNLOAD_BYTES = 80 * 1024 * 1024  # 80 MB hard cap on raw download
-STREAM_CHUNK = 16 * 1024  # 16KB
-POOL_MAXSIZE = 50
+# hard cap on raw download; checked against HEAD Content-Length before any body is fetched
+MAX_DOWNLOAD_BYTES = int(os.environ.get("IMAGEVAULT_MAX_DOWNLOAD_BYTES", 80 * 1024 * 1024))  # 80 MB
+MAX_INPUT_PIXELS = 150_000_000  # reject sources larger than this (after JPEG draft) before full decode
+STREAM_CHUNK = 64 * 1024  # 64KB per raw socket read
+B64_STREAM_CHUNK = 48 * 1024  # 48KB of raw bytes per base64 slice (multiple of 3 -> no padding mid-stream)
+POOL_CONNECTIONS = 50  # number of per-host pools kept alive (requests' default of 10 churns TLS across many CDNs)
+POOL_MAXSIZE = 50      # keep-alive connections per host
 RETRIES_TOTAL = 3
+SERVER_WORKERS = os.cpu_count() or 1  # gunicorn worker processes
+SERVER_THREADS = 8  # gthread threads per worker: downloads overlap with resizes in other threads
+# >0: run decode + resize in a process pool of this size per server worker (CPU-saturated deployments).
+# 0 keeps it on the request thread; note gunicorn already runs one process per core by default.
+PROCESS_POOL_WORKERS = int(os.environ.get("IMAGEVAULT_PROCESS_WORKERS", "0"))
+CACHE_DIR = os.environ.get("IMAGEVAULT_CACHE_DIR",
+                           "/dev/shm/imgvault" if os.path.isdir("/dev/shm") else os.path.join(tempfile.gettempdir(), "imgvault"))
+CACHE_SIZE_LIMIT = 2 << 30  # 2 GB of rendered results, least-recently-used evicted first
+# Seconds a rendered result is served from cache; an image changed at its URL can be served this stale. 0 = never expire
+CACHE_TTL = int(os.environ.get("IMAGEVAULT_CACHE_TTL", "3600")) or None
 # ===========================
 
-# Improve PIL resilience for truncated/progressive images
-ImageFile.LOAD_TRUNCATED_IMAGES = True
-ImageFile.MAX_IMAGE_PIXELS = None  # we'll enforce pixels manually in code
+# Truncated-image recovery is slower, so it's only switched on for the fallback decode (see load_truncated_images).
+# PIL only ever tests this flag's truthiness, so a thread-local stand-in scopes it to the thread doing the fallback.
+class _ThreadLocalFlag(threading.local):
+    enabled = False
+
+    def __bool__(self):
+        return self.enabled
+
+ImageFile.LOAD_TRUNCATED_IMAGES = _truncated_flag = _ThreadLocalFlag()
+# Disable PIL's own decompression-bomb guard (it lives on Image, not ImageFile): it would raise from Image.open
+# on the header size, before draft() gets a chance to shrink a large JPEG. check_input_pixels() enforces
+# MAX_INPUT_PIXELS instead, at the drafted size for JPEG and at the full size for everything else.
+Image.MAX_IMAGE_PIXELS = None
 
 def logi(msg): print("[Converter][INFO] " + str(msg))
 def logd(msg): print("[Converter][DEBUG] " + str(msg))
 def logw(msg): print("[Converter][WARN] " + str(msg))
 def loge(msg): print("[Converter][ERROR] " + str(msg))
 
+# Prefer pybase64 (SIMD libbase64 backend); fall back to stdlib base64 if it's not installed.
+# Both return bytes: the streamed response goes straight to the socket, so producing a str would
+# only add a second allocation (str) plus Werkzeug's .encode() copy back to bytes per slice.
+try:
+    import pybase64
+
+    def b64encode_bytes(data):
+        return pybase64.b64encode(data)
+
+    # get_version() reports which SIMD codepath (SSSE3/AVX2/AVX512VBMI) was selected at runtime
+    logi(f"base64 backend: pybase64 {pybase64.get_version()}")
+except ImportError:
+    pybase64 = None
+
+    def b64encode_bytes(data):
+        return base64.b64encode(data)
+
+    logw("pybase64 not installed; falling back to stdlib base64 (slower)")
+
+# On-disk LRU cache of rendered (width, height, raw RGB) results; shared by all gunicorn workers
+try:
+    import diskcache
+    render_cache = diskcache.Cache(CACHE_DIR, size_limit=CACHE_SIZE_LIMIT, eviction_policy="least-recently-used")
+    logi(f"Render cache: {CACHE_DIR} (limit {CACHE_SIZE_LIMIT / (1024*1024*1024):.1f} GB, ttl {f'{CACHE_TTL}s' if CACHE_TTL else 'none'})")
+except ImportError:
+    render_cache = None
+    logw("diskcache not installed; render results will not be cached")
+except Exception as e:
+    render_cache = None
+    logw(f"Could not open render cache at {CACHE_DIR}: {e}")
+
+# JPEG decode speed depends on Pillow being built against libjpeg-turbo (SIMD Huffman/IDCT)
+try:
+    from PIL import features as pil_features
+    if pil_features.check_feature("libjpeg_turbo"):
+        logi(f"JPEG backend: libjpeg-turbo {pil_features.version_feature('libjpeg_turbo')}")
+    else:
+        logw("Pillow is not linked against libjpeg-turbo; JPEG decode will be slower (rebuild Pillow with libjpeg-turbo-dev installed)")
+except Exception as e:
+    logd(f"Could not query Pillow features: {e}")
+
 # Create a single session with retry + connection pooling and sensible headers
 session = requests.Session()
 retry_strategy = Retry(
@@ -39,7 +108,7 @@ retry_strategy = Retry(
     allowed_methods=["HEAD", "GET", "OPTIONS"],
     backoff_factor=0.6
 )
-adapter = HTTPAdapter(max_retries=retry_strategy, pool_maxsize=POOL_MAXSIZE)
+adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
 session.mount("http://", adapter)
 session.mount("https://", adapter)
 # Default headers that mimic a real browser and accept modern image formats
@@ -67,6 +136,9 @@ def safe_head(url, headers, timeout):
         logd(f"HEAD failed for {url}: {e}")
         return None
 
+class DownloadTooLarge(ValueError):
+    """Remote image exceeds max_bytes (from HEAD Content-Length or while streaming). Not retried on other candidates."""
+
 def try_alternate_scheme(url):
     """If http -> https or https -> http might help for misconfigured endpoints."""
     if url.startswith("http://"):
@@ -80,7 +152,7 @@ def download_image_bytes(url, timeout=REQUEST_TIMEOUT, max_bytes=MAX_DOWNLOAD_BY
     Robust downloader:
       - Attempts HEAD to check content-type/length
       - Streams GET with chunked reads
-      - Enforces max_bytes cutoff
+      - Enforces max_bytes cutoff (raises DownloadTooLarge, up front when HEAD reports Content-Length)
       - Retries automatically via the session adapter
       - Falls back to alternate scheme and a few header variants
     Returns bytes or raises an exception with a helpful message.
@@ -115,13 +187,14 @@ def download_image_bytes(url, timeout=REQUEST_TIMEOUT, max_bytes=MAX_DOWNLOAD_BY
             if content_length:
                 try:
                     cl = int(content_length)
-                    if cl > max_bytes:
-                        raise ValueError(f"Remote content-length {cl} exceeds max allowed {max_bytes} bytes")
                 except ValueError as ve:
-                    # If content-length is bogus or too large, skip this candidate
+                    # If content-length is bogus, skip this candidate
                     logw(f"HEAD size check failed for {candidate}: {ve}")
                     tried_exceptions.append(str(ve))
                     continue
+                if cl > max_bytes:
+                    # Too large: the fallback candidates are the same resource, so stop before fetching anything
+                    raise DownloadTooLarge(f"Remote content-length {cl} exceeds max allowed {max_bytes} bytes")
 
             if content_type and not is_image_content_type(content_type):
                 logw(f"HEAD says content-type {content_type} is not image; skipping {candidate}")
@@ -137,18 +210,35 @@ def download_image_bytes(url, timeout=REQUEST_TIMEOUT, max_bytes=MAX_DOWNLOAD_BY
                 if ct and not is_image_content_type(ct):
                     raise ValueError(f"Server returned non-image Content-Type: {ct}")
 
+                if resp.headers.get("Content-Encoding", "identity").lower() == "identity":
+                    try:
+                        expected = int(resp.headers.get("Content-Length") or 0)
+                    except ValueError:
+                        expected = 0
+                    if expected > max_bytes:
+                        # HEAD was blocked or disagreed: still refuse before reading the body
+                        raise DownloadTooLarge(f"Remote content-length {expected} exceeds max allowed {max_bytes} bytes")
                 buf = BytesIO()
                 total = 0
-                for chunk in resp.iter_content(chunk_size=STREAM_CHUNK):
-                    if chunk:
-                        buf.write(chunk)
-                        total += len(chunk)
-                        if total > max_bytes:
-                            raise ValueError(f"Download exceeded max bytes ({max_bytes}) - aborting")
+                # Read urllib3's response directly in large pieces instead of going through the
+                # iter_content() -> stream() generator layers; decode_content keeps gzip/deflate/br handling
+                resp.raw.decode_content = True
+                while True:
+                    chunk = resp.raw.read(STREAM_CHUNK)
+                    if not chunk:
+                        break
+                    total += len(chunk)
+                    if total > max_bytes:
+                        raise DownloadTooLarge(f"Download exceeded max bytes ({max_bytes}) - aborting")
+                    buf.write(chunk)
+                # getvalue() hands over BytesIO's own buffer (no copy) and the result is plain bytes,
+                # which BytesIO/Image.open downstream also share without copying
                 data = buf.getvalue()
                 elapsed = time.time() - start_ts
                 logd(f"Downloaded {len(data)} bytes from {candidate} in {elapsed:.2f}s")
                 return data
+        except DownloadTooLarge:
+            raise
         except Exception as e:
             logw(f"GET failed for {candidate}: {e}")
             tried_exceptions.append(f"{candidate}: {e}")
@@ -158,21 +248,94 @@ def download_image_bytes(url, timeout=REQUEST_TIMEOUT, max_bytes=MAX_DOWNLOAD_BY
     # If we reach here, all attempts failed
     raise RuntimeError(f"All download attempts failed for {url}. Tried: {tried_urls}. Errors: {tried_exceptions}")
 
+@contextlib.contextmanager
+def load_truncated_images():
+    """Enable PIL's truncated-image recovery for the block, on the current thread only."""
+    prev = _truncated_flag.enabled
+    _truncated_flag.enabled = True
+    try:
+        yield
+    finally:
+        _truncated_flag.enabled = prev
+
+def check_input_pixels(width, height):
+    """Raise a 413 RenderError if width x height would exceed MAX_INPUT_PIXELS once decoded."""
+    if width * height > MAX_INPUT_PIXELS:
+        logw(f"Rejecting image {width}x{height}: exceeds MAX_INPUT_PIXELS ({MAX_INPUT_PIXELS})")
+        raise RenderError(f"Image too large: {width}x{height} exceeds {MAX_INPUT_PIXELS} pixels", 413)
+
+def prepare_for_decode(img, target_size):
+    """JPEG draft() to target_size + pixel cap check on a freshly opened (not yet loaded) image."""
+    if img.format == "JPEG":
+        # let libjpeg do DCT-domain scaling (1/2, 1/4, 1/8) instead of a full-res IDCT.
+        # draft() never goes below the requested size, so the LANCZOS pass still hits the target exactly.
+        orig_size = img.size
+        img.draft("RGB", target_size)
+        logd(f"JPEG draft decode: {orig_size[0]}x{orig_size[1]} -> {img.size[0]}x{img.size[1]}")
+    # Reject pixel bombs before anything is decoded (JPEG is checked at its drafted size)
+    check_input_pixels(img.width, img.height)
+    return img
+
+def open_with_parser(data):
+    """Slow path for input Image.open rejects: incremental parser with truncated-image recovery. Raises RenderError."""
+    try:
+        with load_truncated_images():
+            parser = ImageFile.Parser()
+            parser.feed(data)
+            # feed() has parsed the header but not decoded yet; the parser can't draft(), so cap the full size
+            if parser.image is not None:
+                check_input_pixels(parser.image.width, parser.image.height)
+            img = parser.close()
+    except RenderError:
+        raise
+    except Exception as e:
+        loge("Image open failed: " + str(e))
+        raise RenderError(f"Failed to open image: {e}", 400)
+    logd(f"Parser fallback succeeded - mode={img.mode}, size={img.size}, format={getattr(img, 'format', None)}")
+    return img
+
 def pil_to_rgb_bytes(img):
     if img.mode != "RGB":
         img = img.convert("RGB")
     return img.tobytes(), img.width, img.height
 
-@app.route("/render", methods=["POST"])
-def render():
+def b64_json_prefix(width, height):
+    """Everything stream_b64_json() yields before the base64 data."""
+    return f'{{"width": {width}, "height": {height}, "base64_data": "'.encode("ascii")
+
+def stream_b64_json(raw_bytes, width, height, chunk_size=B64_STREAM_CHUNK):
+    """
+    Yield {"width","height","base64_data"} JSON piecewise, encoding raw_bytes in
+    chunk_size slices so the full base64 string / JSON body is never built in memory.
+    chunk_size must be a multiple of 3 so every slice encodes to whole quartets.
+    """
+    view = memoryview(raw_bytes)
+    yield b64_json_prefix(width, height)
+    for i in range(0, len(view), chunk_size):
+        yield b64encode_bytes(view[i:i + chunk_size])
+    yield b'"}'
+
+class RenderError(Exception):
+    """Pipeline failure that maps straight to a JSON {"error": ...} response with the given HTTP status."""
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+    def __reduce__(self):
+        # keep the status when raised inside the process pool and pickled back
+        return (RenderError, (self.message, self.status))
+
+def parse_render_request():
+    """Read and sanitize the JSON body shared by /render and /render_raw. Returns (url, resize_factor, max_pixels)."""
     try:
         data = request.get_json(force=True)
     except Exception as e:
         loge("Bad JSON body: " + str(e))
-        return jsonify({"error": "Bad JSON body"}), 400
+        raise RenderError("Bad JSON body", 400)
 
     if not data or "url" not in data:
-        return jsonify({"error": "Missing 'url' field"}), 400
+        raise RenderError("Missing 'url' field", 400)
 
     url = data["url"]
     resize_factor = data.get("resize_factor", DEFAULT_RESIZE_FACTOR)
@@ -195,62 +358,74 @@ def render():
         max_pixels = DEFAULT_MAX_PIXELS
 
     logi(f"Request: url={url} resize_factor={resize_factor} max_pixels={max_pixels}")
+    return url, resize_factor, max_pixels
 
-    # Download with robust downloader
-    try:
-        img_bytes = download_image_bytes(url, timeout=REQUEST_TIMEOUT, max_bytes=MAX_DOWNLOAD_BYTES)
-        logd(f"Downloaded {len(img_bytes)} bytes from {url}")
-    except Exception as e:
-        loge("Download failed: " + str(e))
-        return jsonify({"error": f"Failed to download image: {e}"}), 400
+def process_image_bytes(img_bytes, resize_factor, max_pixels):
+    """Decode + downscale an encoded image. Returns (raw_rgb_bytes, width, height); raises RenderError."""
+    # One in-memory stream for Image.open and the fallbacks
+    src = BytesIO(img_bytes)
 
-    # Open with PIL (use incremental parser for robustness + to accept progressive JPEG/PNG)
+    # Fast path: Image.open only reads the header. Pixels are decoded by load() below,
+    # after the size checks and JPEG draft() are in place.
     try:
-        parser = ImageFile.Parser()
-        parser.feed(img_bytes)
-        img = parser.close()
-        logd(f"Opened image - mode={img.mode}, size={img.size}, format={getattr(img, 'format', None)}")
+        img = Image.open(src)
+        opened = True
+        orig_w, orig_h = img.size
+        logd(f"Opened image - mode={img.mode}, size={img.size}, format={img.format}")
     except Exception as e:
-        # fallback: try Image.open normally
-        try:
-            img = Image.open(BytesIO(img_bytes))
-            logd(f"Fallback open succeeded - mode={img.mode}, size={img.size}, format={img.format}")
-        except Exception as e2:
-            loge("Image open failed: " + str(e2))
-            return jsonify({"error": f"Failed to open image: {e2}"}), 400
+        logw(f"Image.open failed ({e}); retrying with incremental parser")
+        opened = False
+        img = open_with_parser(src.getvalue())
+        orig_w, orig_h = img.size
 
-    # convert to RGB
-    if img.mode != "RGB":
+    logi(f"Original size: {orig_w}x{orig_h}")
+
+    # Compute target size after integer division resize_factor
+    target_w = max(1, orig_w // resize_factor)
+    target_h = max(1, orig_h // resize_factor)
+
+    # enforce max_pixels up front: fold the extra proportional scale into the target
+    # so there's a single LANCZOS pass instead of resizing twice
+    if target_w * target_h > max_pixels:
+        scale = math.sqrt(max_pixels / (target_w * target_h))
+        final_w = max(1, int(target_w * scale))
+        final_h = max(1, int(target_h * scale))
+        logw(f"Downscale target still too big ({target_w * target_h} px) -> applying additional scale {scale:.4f} to {final_w}x{final_h}")
+        target_w, target_h = final_w, final_h
+
+    if opened:
+        prepare_for_decode(img, (target_w, target_h))
+        try:
+            img.load()
+        except Exception as e:
+            # Truncated/corrupt data: reopen with recovery enabled, keeping draft() and the pixel cap
+            logw(f"Decode failed ({e}); retrying with truncated-image recovery")
+            try:
+                with load_truncated_images():
+                    src.seek(0)
+                    img = prepare_for_decode(Image.open(src), (target_w, target_h))
+                    img.load()
+            except RenderError:
+                raise
+            except Exception as e2:
+                loge("Image decode failed: " + str(e2))
+                raise RenderError(f"Failed to open image: {e2}", 400)
+
+    # convert to RGB. Greyscale is left single-channel through the resize and expanded afterwards:
+    # channel replication commutes with LANCZOS (bit-identical output) and this skips a full-size RGB copy
+    if img.mode not in ("RGB", "L"):
         img = img.convert("RGB")
 
-    orig_w, orig_h = img.size
-    logi(f"Original size: {orig_w}x{orig_h}")
+    # Single LANCZOS pass straight to the exact target (resize_factor and max_pixels are folded in above),
+    # so every format comes out at the same size. reducing_gap keeps thumbnail()'s fast pre-reduce step.
+    logi(f"Downscale target: {target_w}x{target_h} (factor {resize_factor})")
+    img = img.resize((target_w, target_h), Image.LANCZOS, reducing_gap=2.0)
+    new_w, new_h = img.size
 
-    # Primary downscale: use thumbnail (fast, in-place, preserves aspect ratio)
-    try:
-        # Compute target size after integer division resize_factor
-        target_w = max(1, orig_w // resize_factor)
-        target_h = max(1, orig_h // resize_factor)
-        logi(f"Primary downscale target: {target_w}x{target_h} (factor {resize_factor})")
-        # Use LANCZOS via thumbnail by passing a tuple
-        img.thumbnail((target_w, target_h), resample=Image.LANCZOS)
-        new_w, new_h = img.size
-    except Exception as e:
-        logw("thumbnail downscale failed, attempting fallback resize: " + str(e))
-        new_w = max(1, orig_w // resize_factor)
-        new_h = max(1, orig_h // resize_factor)
-        img = img.resize((new_w, new_h), Image.LANCZOS)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
 
-    # enforce max_pixels: if still larger, scale further proportionally
     total_pixels = new_w * new_h
-    if total_pixels > max_pixels:
-        scale = math.sqrt(max_pixels / total_pixels)
-        final_w = max(1, int(new_w * scale))
-        final_h = max(1, int(new_h * scale))
-        logw(f"After downscale still too big ({total_pixels} px) -> applying additional scale {scale:.4f} to {final_w}x{final_h}")
-        img = img.resize((final_w, final_h), Image.LANCZOS)
-        new_w, new_h = final_w, final_h
-        total_pixels = new_w * new_h
 
     logi(f"Final size to encode: {new_w}x{new_h} ({total_pixels} pixels)")
 
@@ -258,31 +433,234 @@ def render():
         raw_bytes = img.tobytes()
     except Exception as e:
         loge("tobytes failed: " + str(e))
-        return jsonify({"error": f"Failed to get raw bytes: {e}"}), 500
+        raise RenderError(f"Failed to get raw bytes: {e}", 500)
+
+    return raw_bytes, new_w, new_h
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
 
-    # base64 encode
+def get_process_pool():
+    """Lazily create the decode/resize process pool (after gunicorn forks its workers). None when disabled."""
+    global _process_pool
+    if PROCESS_POOL_WORKERS <= 0:
+        return None
+    with _process_pool_lock:
+        if _process_pool is None:
+            # forkserver + preload: children fork from a clean single-threaded process that has already
+            # imported PIL/pybase64, instead of forking a multi-threaded server worker
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                ctx = multiprocessing.get_context("forkserver")
+                ctx.set_forkserver_preload([__name__])
+            else:
+                ctx = multiprocessing.get_context("spawn")
+            _process_pool = ProcessPoolExecutor(max_workers=PROCESS_POOL_WORKERS, mp_context=ctx)
+            logi(f"Started decode/resize process pool ({PROCESS_POOL_WORKERS} workers, {ctx.get_start_method()})")
+        return _process_pool
+
+def _process_shm(shm_name, size, resize_factor, max_pixels):
+    """
+    Process-pool entry point: run process_image_bytes() on the encoded image in shared memory and
+    write the raw pixels to a new shared memory block. Returns (block_name, size, width, height);
+    the parent unlinks the block. Only the name is pickled back, never the pixel data.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        # BytesIO takes its own copy, so the view is released before close()
+        with shm.buf[:size] as view:
+            raw_bytes, new_w, new_h = process_image_bytes(view, resize_factor, max_pixels)
+    finally:
+        shm.close()
+
+    out_size = len(raw_bytes)
+    out = shared_memory.SharedMemory(create=True, size=max(1, out_size))
     try:
-        b64 = base64.b64encode(raw_bytes).decode("ascii")
+        out.buf[:out_size] = raw_bytes
+    except BaseException:
+        out.close()
+        out.unlink()
+        raise
+    out.close()
+    return out.name, out_size, new_w, new_h
+
+class PoolUnavailable(Exception):
+    """The process pool couldn't take the job (not created / broken before submit). Safe to run on the request thread."""
+
+def _drop_process_pool(pool):
+    """Forget a broken pool so the next request starts a fresh one."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+
+def process_in_pool(pool, img_bytes, resize_factor, max_pixels):
+    """
+    Run process_image_bytes() in the process pool, passing the input and the result via shared memory instead of pickling them.
+    Raises PoolUnavailable if the job never reached a child; failures after that become a RenderError.
+    """
+    size = len(img_bytes)
+    try:
+        shm = shared_memory.SharedMemory(create=True, size=max(1, size))
+    except Exception as e:
+        raise PoolUnavailable(f"shared memory unavailable: {e}")
+    try:
+        shm.buf[:size] = img_bytes
+        try:
+            future = pool.submit(_process_shm, shm.name, size, resize_factor, max_pixels)
+        except BrokenProcessPool as e:
+            _drop_process_pool(pool)
+            raise PoolUnavailable(f"pool already broken: {e}")
+        except RuntimeError as e:
+            raise PoolUnavailable(str(e))  # pool shut down
+        try:
+            out_name, out_size, new_w, new_h = future.result()
+        except RenderError:
+            raise
+        except BrokenProcessPool as e:
+            # a child died (e.g. OOM-killed), possibly on this very input: don't retry it in the server worker
+            _drop_process_pool(pool)
+            loge(f"Process pool worker died: {e}")
+            raise RenderError("Image processing worker crashed", 500)
+        except Exception as e:
+            loge(f"Image processing failed in pool: {e}")
+            raise RenderError(f"Image processing failed: {e}", 500)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    out = shared_memory.SharedMemory(name=out_name)
+    try:
+        raw_bytes = bytes(out.buf[:out_size])
+    finally:
+        out.close()
+        out.unlink()
+    return raw_bytes, new_w, new_h
+
+def render_pipeline():
+    """Parse the request, then serve from render_cache or download the image and run it through process_image_bytes()."""
+    url, resize_factor, max_pixels = parse_render_request()
+
+    # A hit skips download + decode + resize entirely. The image at a URL can change, so a hit
+    # may be up to CACHE_TTL seconds stale (entries expire after that)
+    cache_key = hashlib.sha256(f"{url}|{resize_factor}|{max_pixels}".encode()).digest()
+    if render_cache is not None:
+        try:
+            cached = render_cache.get(cache_key)
+        except Exception as e:
+            logw(f"Render cache read failed: {e}")
+            cached = None
+        if cached is not None:
+            new_w, new_h, raw_bytes = cached
+            logi(f"Cache hit for {url}: {new_w}x{new_h}")
+            return raw_bytes, new_w, new_h
+
+    # Download with robust downloader
+    try:
+        img_bytes = download_image_bytes(url, timeout=REQUEST_TIMEOUT, max_bytes=MAX_DOWNLOAD_BYTES)
+        logd(f"Downloaded {len(img_bytes)} bytes from {url}")
+    except DownloadTooLarge as e:
+        logw("Download rejected: " + str(e))
+        raise RenderError(f"Image too large: {e}", 413)
     except Exception as e:
-        loge("base64 encode failed: " + str(e))
-        return jsonify({"error": f"Base64 encode failed: {e}"}), 500
+        loge("Download failed: " + str(e))
+        raise RenderError(f"Failed to download image: {e}", 400)
+
+    try:
+        pool = get_process_pool()
+    except Exception as e:
+        logw(f"Could not start process pool ({e}); processing on the request thread")
+        pool = None
+    result = None
+    if pool is not None:
+        try:
+            result = process_in_pool(pool, img_bytes, resize_factor, max_pixels)
+        except PoolUnavailable as e:
+            logw(f"Process pool unavailable ({e}); processing on the request thread")
+    if result is None:
+        result = process_image_bytes(img_bytes, resize_factor, max_pixels)
+    raw_bytes, new_w, new_h = result
+
+    if render_cache is not None:
+        try:
+            render_cache.set(cache_key, (new_w, new_h, raw_bytes), expire=CACHE_TTL)
+        except Exception as e:
+            logw(f"Render cache write failed: {e}")
+
+    return raw_bytes, new_w, new_h
+
+@app.route("/render", methods=["POST"])
+def render():
+    """JSON response with base64 RGB data. Prefer /render_raw where the client can take binary: it skips base64 entirely."""
+    try:
+        raw_bytes, new_w, new_h = render_pipeline()
+    except RenderError as e:
+        return jsonify({"error": e.message}), e.status
+
+    b64_len = 4 * ((len(raw_bytes) + 2) // 3)
+    encoded_mb = len(raw_bytes) / (1024*1024)
+    logi(f"Encoded payload ~{encoded_mb:.2f} MB (base64 length {b64_len})")
+
+    # Stream the base64 JSON body (Roblox will decode); encoding overlaps with the socket send.
+    # The length is known up front (prefix + base64 + closing '"}'), so send it rather than chunked encoding
+    content_length = len(b64_json_prefix(new_w, new_h)) + b64_len + 2
+    return Response(stream_with_context(stream_b64_json(raw_bytes, new_w, new_h)), mimetype="application/json",
+                    headers={"Content-Length": str(content_length)})
+
+@app.route("/render_raw", methods=["POST"])
+def render_raw():
+    """
+    Same pipeline as /render, but returns the raw RGB buffer as application/octet-stream
+    with dimensions in X-Width / X-Height. No base64 encode pass and ~33% less on the wire,
+    so roughly 2x faster end-to-end for clients that can read binary bodies.
+    """
+    try:
+        raw_bytes, new_w, new_h = render_pipeline()
+    except RenderError as e:
+        return jsonify({"error": e.message}), e.status
+
+    logi(f"Raw payload {len(raw_bytes) / (1024*1024):.2f} MB")
+    return Response(raw_bytes, mimetype="application/octet-stream",
+                    headers={"X-Width": str(new_w), "X-Height": str(new_h)})
+
+def run_gunicorn(host, port, workers, threads):
+    """Serve app under gunicorn with gthread workers (the Werkzeug dev server handles one request at a time)."""
+    from gunicorn.app.base import BaseApplication
+
+    class ConverterApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{host}:{port}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("threads", threads)
+            if os.path.isdir("/dev/shm"):
+                self.cfg.set("worker_tmp_dir", "/dev/shm")
 
-    encoded_mb = (len(b64) * 3 / 4) / (1024*1024)
-    logi(f"Encoded payload ~{encoded_mb:.2f} MB (base64 length {len(b64)})")
+        def load(self):
+            return app
 
-    # Return trimmed metadata in logs, full b64 in response (Roblox will decode)
-    return jsonify({"width": new_w, "height": new_h, "base64_data": b64})
+    ConverterApplication().run()
 
 # Auto-launch
+# Equivalent to: gunicorn -k gthread --threads 8 -w $(nproc) --worker-tmp-dir /dev/shm imagevault64_api:app
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description="Image -> RawRGB converter (Flask).")
     parser.add_argument("--host", default="0.0.0.0")
     parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS)
+    parser.add_argument("--threads", type=int, default=SERVER_THREADS)
+    parser.add_argument("--dev", action="store_true", help="Use the Flask dev server instead of gunicorn")
     args = parser.parse_args()
     logi(f"Starting Image Converter Flask server on {args.host}:{args.port}")
     try:
-        app.run(host=args.host, port=args.port, debug=False)
+        if not args.dev:
+            try:
+                logi(f"Using gunicorn: {args.workers} gthread workers x {args.threads} threads")
+                run_gunicorn(args.host, args.port, args.workers, args.threads)
+                sys.exit(0)
+            except ImportError:
+                logw("gunicorn not installed; falling back to the threaded Flask dev server")
+        app.run(host=args.host, port=args.port, debug=False, threaded=True)
     except Exception as e:
         loge("Failed to start server: " + str(e))
         traceback.print_exc()